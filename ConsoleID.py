@@ -12,7 +12,7 @@ import argparse
 import sys
 
 # non-standard imports
-from GameID import DEFAULT_BUFSIZE, GC_MAGIC_WORD, GENESIS_MAGIC_WORDS, SATURN_MAGIC_WORD, SEGACD_MAGIC_WORDS
+from GameID import DEFAULT_BUFSIZE, GC_MAGIC_WORD, GENESIS_MAGIC_WORDS_MAX_LEN, GENESIS_MAGIC_WORDS_REGEX, SATURN_MAGIC_WORD, SEGACD_MAGIC_WORDS_MAX_LEN, SEGACD_MAGIC_WORDS_REGEX
 from GameID import bins_from_cue, check_exists, check_not_exists, error, get_extension, getsize, ISO9660, ISO9660FP, open_file
 
 # ConsoleID constants
@@ -125,33 +125,25 @@ def identify(fn, bufsize=DEFAULT_BUFSIZE):
 
         # check GameCube: https://hitmen.c02.at/files/yagcd/yagcd/chap13.html#sec13
         if console is None:
-            for i in range(0x100): # 0x100 is arbitrary; too big = slow if not a GC game
-                if header[i : i + 4] == GC_MAGIC_WORD:
-                    console = 'GC'; break
+            if header.find(GC_MAGIC_WORD, 0, 0x100 + len(GC_MAGIC_WORD) - 1) != -1: # match must start in [0, 0x100); 0x100 is arbitrary
+                console = 'GC'
 
         # check SegaCD (must do before Genesis, as SegaCD games have Genesis magic words too)
         if console is None:
-            for magic_word in SEGACD_MAGIC_WORDS:
-                for i in range(0x100): # 0x100 is arbitrary; too big = slow if not a SegaCD game
-                    if header[i : i + len(magic_word)] == magic_word:
-                        console = 'SegaCD'; break
-                if console is not None:
-                    break
+            magic_word_match = SEGACD_MAGIC_WORDS_REGEX.search(header, 0, 0x100 + SEGACD_MAGIC_WORDS_MAX_LEN - 1) # all magic words in a single pass
+            if magic_word_match is not None and magic_word_match.start() < 0x100: # match must start in [0, 0x100); 0x100 is arbitrary
+                console = 'SegaCD'
 
         # check Genesis
         if console is None:
-            for magic_word in GENESIS_MAGIC_WORDS:
-                for i in range(0x100, 0x200): # # 0x200 is arbitrary; too big = slow if not a Genesis game
-                    if header[i : i + len(magic_word)] == magic_word:
-                        console = 'Genesis'; break
-                if console is not None:
-                    break
+            magic_word_match = GENESIS_MAGIC_WORDS_REGEX.search(header, 0x100, 0x200 + GENESIS_MAGIC_WORDS_MAX_LEN - 1) # 0x200 is arbitrary; too big = slow if not a Genesis game
+            if magic_word_match is not None and magic_word_match.start() < 0x200: # match must start in [0x100, 0x200)
+                console = 'Genesis'
 
         # check Saturn
         if console is None:
-            for i in range(0x100): # 0x100 is arbitrary; too big = slow if not a Saturn game
-                if header[i : i + 0xF] == SATURN_MAGIC_WORD:
-                    console = 'Saturn'; break
+            if header.find(SATURN_MAGIC_WORD, 0, 0x100 + len(SATURN_MAGIC_WORD) - 1) != -1: # match must start in [0, 0x100); 0x100 is arbitrary
+                console = 'Saturn'
 
     # next try to identify ISO 9660 game (e.g. PSX, PS2, etc.)
     if console is None and (ext in ISO9660_EXTS or isdir(fn)):
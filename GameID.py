@@ -4,30 +4,47 @@ GameID: Identify a game using GameDB
 '''
 
 # standard imports
-from datetime import datetime
-from glob import glob
-from gzip import decompress as gdecompress
+from functools import cached_property, lru_cache
+from glob import escape, glob
+from gzip import GzipFile
 from gzip import open as gopen
-from io import BytesIO
-from os.path import abspath, expanduser, isdir, isfile
+from io import BufferedReader, BytesIO
+from os import environ, getpid, makedirs, remove, replace, stat
+from os.path import abspath, basename, dirname, expanduser, isdir, isfile, join
+from pickle import dump as pdump
+from pickle import dumps as pdumps
+from pickle import load as pload
 from pickle import loads as ploads
-from struct import unpack
+from pickle import UnpicklingError
+from stat import S_ISDIR, S_ISREG
+from struct import Struct
 from sys import stderr
-from zipfile import ZipFile
 import sys
 import argparse
+import re
+from zlib import crc32
 
 # GameID constants
 VERSION = '1.0.28'
-DB_URL = 'https://github.com/niemasd/GameID/raw/main/db.pkl.gz'
+DB_URL = 'https://github.com/niemasd/GameID/raw/main/db_sections.pkl.gz' # sectioned layout (db.pkl.gz stays in the plain layout that older GameID versions download)
 DEFAULT_INTERNET_TIMEOUT = 1 # seconds
 DEFAULT_BUFSIZE = 1000000
 FILE_MODES_GZ = {'rb', 'wb', 'rt', 'wt'}
 STRIP_EXT = ['gz'] # list instead of set to iterate in order (just in case)
+CUE_FILE_REGEX = re.compile(rb'^\s*FILE\s+"([^"]+)"', re.IGNORECASE | re.MULTILINE) # quoted filename of each FILE line of a CUE
 ISO9660_PVD_MAGIC_WORD = bytes([0x01] + [ord(c) for c in 'CD001'])
 ISO9660_DOT_DIRNAMES = {b'\x00', b'\x01'}
+ISO9660_SECTOR_DATA_SIZE = 2048 # user data bytes per sector (directory extents are made of these, regardless of the image's block size)
+ISO9660_FIND_CHUNK_SIZE = 65536 # how many bytes to read at a time when searching a non-memory-mapped (e.g. GZIP) disc image
+ISO9660_UINT32 = Struct('<I') # precompiled little-endian uint32
+ISO9660_DIR_LBA_SIZE = Struct('<I4xI') # directory record: LBA (LE) + 4 bytes (BE copy of LBA) + data length (LE), read in one call
+ISO9660_PATH_TABLE_LBA_PARENT = Struct('<IH') # path table entry: directory LBA + parent directory number, read in one call
+UINT16_BE = Struct('>H') # precompiled big-endian uint16 (GB global checksum, Genesis checksum)
 MONTH_3LET_TO_FULL = {'JAN': 'January', 'FEB': 'February', 'MAR': 'March', 'APR': 'April', 'MAY': 'May', 'JUN': 'June', 'JUL': 'July', 'AUG': 'August', 'SEP': 'September', 'OCT': 'October', 'NOV': 'November', 'DEC': 'December'}
+HEX_FIELDS = {'checksum': 4, 'developer_ID': 2, 'device_type': 2, 'global_checksum_actual': 4, 'global_checksum_expected': 4, 'header_checksum_actual': 2, 'header_checksum_expected': 2, 'main_unit_code': 2} # output fields stored as ints, printed as 0x-prefixed hex (value = number of digits)
 SAFE = set('-.!0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+NONPRINTABLE_BYTES = bytes(v for v in range(256) if not (ord(' ') <= v <= ord('~'))) # for bytes.translate: delete non-printable bytes
+NONPRINTABLE_TO_SPACE = bytes(v if ord(' ') <= v <= ord('~') else ord(' ') for v in range(256)) # for bytes.translate: non-printable bytes --> ' '
 
 # GB/GBC constants
 GB_CARTRIDGE_TYPES = {0: 'ROM', 1: 'MBC1', 2: 'MBC1 + RAM', 3: 'MBC1 + RAM + Battery', 5: 'MBC2', 6: 'MBC2 + Battery', 8: 'ROM + RAM', 9: 'ROM + RAM + Battery', 11: 'MMM01', 12: 'MMM01 + RAM', 13: 'MMM01 + RAM + Battery', 15: 'MBC3 + Timer + Battery', 16: 'MBC3 + Timer + RAM + Battery', 17: 'MBC3', 18: 'MBC3 + RAM', 19: 'MBC3 + RAM + Battery', 25: 'MBC5', 26: 'MBC5 + RAM', 27: 'MBC5 + RAM + Battery', 28: 'MBC5 + Rumble', 29: 'MBC5 + Rumble + RAM', 30: 'MBC5 + Rumble + RAM + Battery', 32: 'MBC6', 34: 'MBC7 + Sensor + Rumble + RAM + Battery', 252: 'Pocket Camera', 253: 'Bandai TAMA5', 254: 'HuC3', 255: 'HuC1 + RAM + Battery'}
@@ -43,29 +60,48 @@ GBA_NINTENDO_LOGO = bytes([0x24, 0xFF, 0xAE, 0x51, 0x69, 0x9A, 0xA2, 0x21, 0x3D,
 # GC constants
 GC_MAGIC_WORD = bytes([0xc2, 0x33, 0x9f, 0x3d])
 
+# helper class for str.translate tables that map every character missing from them to '_' (without adding it, unlike defaultdict)
+class UnderscoreTranslateTable(dict):
+    def __missing__(self, k):
+        return '_'
+
 # Genesis constants
 GENESIS_DEVICE_SUPPORT = {'J': '3-button Controller', '6': '6-button Controller', '0': 'Master System Controller', 'A': 'Analog Joystick', '4': 'Multitap', 'G': 'Lightgun', 'L': 'Activator', 'M': 'Mouse', 'B': 'Trackball', 'T': 'Tablet', 'V': 'Paddle', 'K': 'Keyboard or Keypad', 'R': 'RS-232', 'P': 'Printer', 'C': 'CD-ROM (Sega CD)', 'F': 'Floppy Drive', 'D': 'Download'}
 GENESIS_REGION_SUPPORT = {'J': 'Japan', 'U': 'Americas', 'E': 'Europe'}
+GENESIS_ROM_RAM_RANGES = Struct('>4I') # ROM start, ROM end, RAM start, RAM end (consecutive big-endian uint32s), read in one call
 GENESIS_SOFTWARE_TYPES = {'GM': 'Game', 'AI': 'Aid', 'OS': 'Boot ROM (TMSS)', 'BR': 'Boot ROM (Sega CD)'}
 GENESIS_MAGIC_WORDS = [bytes(ord(c) for c in w) for w in ["SEGA GENESIS", "SEGA MEGA DRIVE", "SEGA 32X", "SEGA EVERDRIVE", "SEGA SSF", "SEGA MEGAWIFI", "SEGA PICO", "SEGA TERA68K", "SEGA TERA286"]]
+GENESIS_MAGIC_WORDS_REGEX = re.compile(b'|'.join(re.escape(w) for w in GENESIS_MAGIC_WORDS)) # find all magic words in a single pass
+GENESIS_MAGIC_WORDS_MAX_LEN = max(len(w) for w in GENESIS_MAGIC_WORDS)
+GENESIS_SERIAL_TRANSLATE = UnderscoreTranslateTable({ord(c):(None if c == '-' else c) for c in SAFE}) # for str.translate: unsafe characters --> '_', delete '-'
 
 # N64 constants
 N64_FIRST_WORD = b'\x80\x37\x12\x40'
+N64_FIRST_WORD_BYTESWAPPED = b'\x37\x80\x40\x12' # first word of byte-swapped (little-endian) ROMs
 
 # PSX constants
 PSX_HEADER = b'\x00\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff\x00'
+PSX_PS2_SERIAL_TRANSLATE = str.maketrans({'.': None, '-': '_'}) # for str.translate: root filename (e.g. SLUS_123.45) --> serial (e.g. SLUS_12345)
 
 # Saturn constants
 SATURN_MAGIC_WORD = bytes(ord(c) for c in 'SEGA SEGASATURN')
 SATURN_DEVICE_SUPPORT = {'J': 'Joypad', 'M': 'Mouse', 'G': 'Gun', 'W': 'RAM Cart', 'S': 'Steering Wheel', 'A': 'Virtua Stick or Analog Controller', 'E': 'Analog Controller (3D-pad)', 'T': 'Multi-Tap', 'C': 'Link Cable', 'D': 'Link Cable (Direct Link)', 'X': 'X-Band or Netlink Modem', 'K': 'Keyboard', 'Q': 'Pachinko Controller', 'F': 'Floppy Disk Drive', 'R': 'ROM Cart', 'P': 'Video CD Card (MPEG Movie Card)'}
 SATURN_TARGET_AREAS = {'J': 'Japan', 'T': 'Asia NTSC (Taiwan, Philippines)', 'U': 'North America (USA, Canada)', 'B': 'Central and South America NTSC (Brazil)', 'K': 'Korea', 'A': 'East Asia PAL (China, Middle and Near East)', 'E': 'Europe PAL', 'L': 'Central and South America PAL'}
+SATURN_SERIAL_TRANSLATE = str.maketrans('', '', '- ') # for str.translate: delete '-' and ' '
 
 # SegaCD constants
 SEGACD_MAGIC_WORDS = [bytes(ord(c) for c in w) for w in ['SEGADISCSYSTEM', 'SEGABOOTDISC', 'SEGADISC', 'SEGADATADISC']]
+SEGACD_MAGIC_WORDS_REGEX = re.compile(b'|'.join(re.escape(w) for w in SEGACD_MAGIC_WORDS)) # find all magic words in a single pass
+SEGACD_MAGIC_WORDS_MAX_LEN = max(len(w) for w in SEGACD_MAGIC_WORDS)
+SEGACD_SERIAL_TRANSLATE = str.maketrans('', '', '#- ') # for str.translate: delete '#', '-', and ' '
 
 # SNES constants
 SNES_LOROM_HEADER_START = 0x7FC0
 SNES_HIROM_HEADER_START = 0xFFC0
+SNES_HARDWARE = ["ROM", "ROM + RAM", "ROM + RAM + Battery"] # $FFD6 = 0x00, 0x01, 0x02
+SNES_HARDWARE_COPROCESSOR = ["ROM + Coprocessor", "ROM + Coprocessor + RAM", "ROM + Coprocessor + RAM + Battery", "ROM + Coprocessor + Battery"] # $FFD6 low nibble = 0x3, 0x4, 0x5, 0x6
+SNES_COPROCESSORS = ["DSP", "GSU / SuperFX", "OBC1", "SA-1", "S-DD1", "S-RTC"] # $FFD6 high nibble = 0x0, 0x1, 0x2, 0x3, 0x4, 0x5
+SNES_COPROCESSORS_CUSTOM = ["SPC7110", "ST010 / ST011", "ST018", "CX4"] # $FFD6 high nibble = 0xF, $FFBF = 0x00, 0x01, 0x02, 0x03
 
 # recursively iterate using glob
 def recursive_glob(fn):
@@ -97,17 +133,25 @@ def error(message, exitcode=1):
 
 # check if a file exists and throw an error if it doesn't
 def check_exists(fn):
-    if not isfile(fn) and not isdir(fn) and not fn.lower().startswith('/dev/'):
+    if not is_file_or_dir(fn) and not fn.lower().startswith('/dev/'):
         error("File/folder not found: %s" % fn)
 
 # check if a file doesn't exist and throw an error if it does
 def check_not_exists(fn):
-    if isfile(fn) or isdir(fn):
+    if is_file_or_dir(fn):
         error("File/folder exists: %s" % fn)
 
+# check if a path is a regular file or a folder (one stat instead of isfile() + isdir())
+def is_file_or_dir(fn):
+    try:
+        mode = stat(fn).st_mode
+    except:
+        return False
+    return S_ISREG(mode) or S_ISDIR(mode)
+
 # open an output text file for writing (automatically handle gzip)
 def open_file(fn, mode='rt', bufsize=DEFAULT_BUFSIZE):
-    ext = fn.split('.')[-1].strip().lower()
+    ext = fn[fn.rfind('.')+1:].strip().lower()
 
     # standard output/input
     if fn == 'stdout':
@@ -126,10 +170,21 @@ def open_file(fn, mode='rt', bufsize=DEFAULT_BUFSIZE):
         else:
             error("Invalid gzip file mode: %s" % mode)
 
+    # Zstandard files (only in the standard library as of Python 3.14)
+    elif ext == 'zst':
+        if mode not in FILE_MODES_GZ:
+            error("Invalid zstd file mode: %s" % mode)
+        try:
+            from compression.zstd import open as zopen
+        except:
+            error("Zstandard files require Python 3.14+: %s" % fn)
+        f = zopen(fn, mode)
+
     # ZIP files
     elif ext == 'zip':
         if 'r' not in mode or 'w' in mode:
             error("Only read mode is supported for gzip files")
+        from zipfile import ZipFile # only imported when needed (it pulls in several other modules, which slows down startup)
         z = ZipFile(fn, 'r'); names = z.namelist()
         if len(names) != 1:
             error("More than 1 file in zip: %s" % fn)
@@ -148,14 +203,21 @@ def get_extension(fn):
             fn = fn[:-len(ext)-1]
     return fn.split('.')[-1].strip()
 
+# try to decode bytes as a (stripped) string, and just return the original bytes if it fails
+def try_decode(data):
+    try:
+        return data.decode().strip()
+    except:
+        return data
+
 # get bins from CUE
 def bins_from_cue(fn):
     if get_extension(fn) != 'cue':
         error("Not a CUE file: %s" % fn)
-    f_cue = open_file(fn, 'rt')
-    bins = ['%s/%s' % ('/'.join(abspath(expanduser(fn)).split('/')[:-1]), l.split('"')[1].strip()) for l in f_cue if l.strip().lower().startswith('file')]
-    f_cue.close()
-    return bins
+    with open_file(fn, 'rb') as f_cue:
+        data = f_cue.read()
+    cue_dir = dirname(abspath(expanduser(fn)))
+    return tuple(join(cue_dir, m.group(1).decode().strip()) for m in CUE_FILE_REGEX.finditer(data))
 
 # helper class to handle mounted discs / extracted images
 class MountedDisc:
@@ -211,26 +273,24 @@ class MountedDisc:
 class ISO9660:
     # initialize ISO handling
     def __init__(self, fn, quiet=False, bufsize=DEFAULT_BUFSIZE):
-        if fn.split('.')[-1].strip().lower() in {'7z', 'zip'}:
+        ext = fn[fn.rfind('.')+1:].strip().lower()
+        if ext in {'7z', 'zip'}:
             if quiet:
                 error()
             else:
-                error("%s files are not yet supported" % (fn.split('.')[-1].strip().lower()))
+                error("%s files are not yet supported" % ext)
         self.fn = abspath(expanduser(fn))
-        if fn.lower().endswith('.cue'):
+        if fn[-4:].lower() == '.cue':
             self.bins = bins_from_cue(fn)
-            self.sizes = [getsize(b) for b in self.bins]
-            self.size = sum(self.sizes)
-            self.f = ISO9660FP(self.bins[0])
         else:
-            self.f = ISO9660FP(self.fn)
-            self.sizes = [getsize(self.fn)]
-            self.size = self.sizes[0]
+            self.bins = (self.fn,)
+        self.f = ISO9660FP(self.bins[0], bufsize=bufsize) # only the first bin is ever opened (it holds the PVD and directories)
 
-        # determine block size from just first track
-        if (self.sizes[0] % 2352) == 0:
+        # determine block size from just first track (all tracks are assumed to share the same sector size, so only stat the first one)
+        first_size = self.f.get_size() # from the already-open handle (getsize() would stat + reopen the file)
+        if (first_size % 2352) == 0:
             self.block_size = 2352
-        elif (self.sizes[0] % 2048) == 0:
+        elif (first_size % 2048) == 0:
             self.block_size = 2048
         else:
             if quiet:
@@ -239,24 +299,22 @@ class ISO9660:
                 error("Invalid disc image block size: %s" % fn)
 
         # load PVD (always starts with 0x01 followed by 'CD0001'): https://wiki.osdev.org/ISO_9660#The_Primary_Volume_Descriptor
-        self.pvd = None; header = self.f.read(1000000) # 1000000 is arbitrary; too large = slow if not valid ISO 9660
-        for i in range(len(header) - len(ISO9660_PVD_MAGIC_WORD) + 1):
-            if header[i : i + len(ISO9660_PVD_MAGIC_WORD)] == ISO9660_PVD_MAGIC_WORD:
-                self.block_offset = i - (16 * self.block_size) # this seems to work regardless of block size or console
-                self.f.seek(i); self.pvd = self.f.read(self.block_size); break
-        if self.pvd is None:
+        i = self.f.find(ISO9660_PVD_MAGIC_WORD, 1000000) # 1000000 is arbitrary; too large = slow if not valid ISO 9660
+        if i == -1:
             error("Invalid ISO9660: %s" % fn)
+        self.block_offset = i - (16 * self.block_size) # this seems to work regardless of block size or console
+        self.f.seek(i); self.pvd = self.f.read(self.block_size)
 
         # load path table: https://wiki.osdev.org/ISO_9660#The_Path_Table
-        path_table_size = unpack('<I', self.pvd[132 : 136])[0]
-        path_table_lba = unpack('<I', self.pvd[140 : 144])[0]
+        path_table_size = ISO9660_UINT32.unpack_from(self.pvd, 132)[0]
+        path_table_lba = ISO9660_UINT32.unpack_from(self.pvd, 140)[0]
         self.f.seek(self.block_offset + (path_table_lba * self.block_size))
         path_table_raw = self.f.read(path_table_size)
         self.path_table = list(); i = 0
         while i < len(path_table_raw):
             curr_dir_name_len = path_table_raw[i]
-            curr_dir_lba = unpack('<I', path_table_raw[i + 2 : i + 6])[0]
-            curr_dir_parent_ind = unpack('<H', path_table_raw[i + 6 : i + 8])[0] - 1 # 1-based indexing --> 0-based
+            curr_dir_lba, curr_dir_parent_ind = ISO9660_PATH_TABLE_LBA_PARENT.unpack_from(path_table_raw, i + 2)
+            curr_dir_parent_ind -= 1 # 1-based indexing --> 0-based
             curr_dir_name = path_table_raw[i + 8 : i + 8 + curr_dir_name_len]
             if curr_dir_name == b'\x00':
                 curr_dir_name = ''; curr_dir_parent_ind = None
@@ -267,80 +325,107 @@ class ISO9660:
                 i += 1 # each table entry starts on an even byte number
             self.path_table.append(('%s/' % curr_dir_name, curr_dir_lba, curr_dir_parent_ind))
 
-    # get system ID
-    def get_system_ID(self):
-        system_ID = self.pvd[8 : 40]
+    # sizes of all bins
+    @cached_property
+    def sizes(self):
+        return [getsize(b) for b in self.bins]
+
+    # total size of all bins
+    @cached_property
+    def size(self):
+        return sum(self.sizes)
+
+    # system ID
+    @cached_property
+    def system_ID(self):
+        return try_decode(self.pvd[8 : 40])
+
+    # volume ID
+    @cached_property
+    def volume_ID(self):
+        return try_decode(self.pvd[40 : 72])
+
+    # publisher ID
+    @cached_property
+    def publisher_ID(self):
+        return try_decode(self.pvd[318 : 446])
+
+    # data preparer ID
+    @cached_property
+    def data_preparer_ID(self):
+        return try_decode(self.pvd[446 : 574])
+
+    # UUID (usually YYYY-MM-DD-HH-MM-SS-?? but not always a valid date)
+    @cached_property
+    def uuid(self):
+        # find UUID (usually offset 813 of PVD, but could be different)
+        uuid = self.pvd[813 : 829]
+
+        # try to parse as text (if it fails, just return the raw bytes)
         try:
-            return system_ID.decode().strip()
+            uuid = uuid.decode()
         except:
-            return system_ID
+            return uuid
+
+        # add dashes to UUID text and return: YYYYMMDDHHMMSS?? --> YYYY-MM-DD-HH-MM-SS-??
+        return '-'.join([uuid[:4]] + [uuid[i:i+2] for i in range(4, len(uuid), 2)])
+
+    # get system ID
+    def get_system_ID(self):
+        return self.system_ID
 
     # get volume ID
     def get_volume_ID(self):
-        volume_ID = self.pvd[40 : 72]
-        try:
-            return volume_ID.decode().strip()
-        except:
-            return volume_ID
+        return self.volume_ID
 
     # get publisher ID
     def get_publisher_ID(self):
-        publisher_ID = self.pvd[318 : 446]
-        try:
-            return publisher_ID.decode().strip()
-        except:
-            return publisher_ID
+        return self.publisher_ID
 
     # get data preparer ID
     def get_data_preparer_ID(self):
-        data_preparer_ID = self.pvd[446 : 574]
-        try:
-            return data_preparer_ID.decode().strip()
-        except:
-            return data_preparer_ID
+        return self.data_preparer_ID
 
     # get UUID (usually YYYY-MM-DD-HH-MM-SS-?? but not always a valid date)
     def get_uuid(self):
-        # find UUID (usually offset 813 of PVD, but could be different)
-        uuid = self.pvd[813 : 829]
-
-        # try to parse as text (if it fails, just return the raw bytes)
-        try:
-            uuid = uuid.decode()
-        except:
-            return uuid
-
-        # add dashes to UUID text and return: YYYYMMDDHHMMSS?? --> YYYY-MM-DD-HH-MM-SS-??
-        out = uuid[:4]
-        for i in range(4, len(uuid), 2):
-            out = out + '-' + uuid[i:i+2]
-        return out
+        return self.uuid
 
     # iterate over files as as (path, LBA, size) tuples: https://wiki.osdev.org/ISO_9660#Recursing_from_the_Root_Directory
     def iter_files(self, only_root_dir=True):
-        # handle each directory one-by-one
-        for dir_name, dir_lba, dir_parent_ind in self.path_table:
+        # handle each directory one-by-one (only the root directory, i.e., the one without a parent, if only_root_dir)
+        unpack_lba_size = ISO9660_DIR_LBA_SIZE.unpack_from # hoisted out of the per-record loop below
+        dirs = [d for d in self.path_table if d[2] is None] if only_root_dir else self.path_table
+        for dir_name, dir_lba, dir_parent_ind in dirs:
             # get full path of current directory
             dir_path = dir_name; tmp_ind = dir_parent_ind
             while tmp_ind is not None:
                 dir_path = '%s%s' % (self.path_table[tmp_ind][0], dir_path); tmp_ind = self.path_table[tmp_ind][2]
 
             # parse directory: https://wiki.osdev.org/ISO_9660#Directories
-            self.f.seek(self.block_offset + (self.block_size * dir_lba))
-            while True:
-                curr_len = self.f.read(1)[0]
-                if curr_len == 0:
-                    break
-                curr_raw = self.f.read(curr_len-1) # already read first byte (curr_len); all indices below are off-by-one as a result
-                curr_flags = curr_raw[24]
+            # (read the whole extent at once, using the data length of its first "." record, then walk the records in memory)
+            dir_start = self.block_offset + (self.block_size * dir_lba)
+            self.f.seek(dir_start + 10); dir_size = ISO9660_UINT32.unpack(self.f.read(4))[0]
+            num_sectors = max(1, (dir_size + ISO9660_SECTOR_DATA_SIZE - 1) // ISO9660_SECTOR_DATA_SIZE)
+            if self.block_size == ISO9660_SECTOR_DATA_SIZE: # sectors are contiguous, so read them all at once
+                self.f.seek(dir_start); dir_raw = self.f.read(num_sectors * ISO9660_SECTOR_DATA_SIZE)
+            else: # raw sectors (e.g. 2352) have headers/ECC between them, so only grab the data part of each
+                dir_raw = list()
+                for sector_ind in range(num_sectors):
+                    self.f.seek(dir_start + (sector_ind * self.block_size)); dir_raw.append(self.f.read(ISO9660_SECTOR_DATA_SIZE))
+                dir_raw = b''.join(dir_raw)
+            dir_raw_len = len(dir_raw); i = 0
+            while i < dir_raw_len:
+                curr_len = dir_raw[i]
+                if curr_len == 0: # records never cross sectors, so the rest of this sector is padding: jump to the next one
+                    i = ((i // ISO9660_SECTOR_DATA_SIZE) + 1) * ISO9660_SECTOR_DATA_SIZE; continue
+                curr_flags = dir_raw[i + 25]
                 if (curr_flags & 0b00000010) != 0:
-                    continue # directory, so I'll handle it in the outer for-loop over the path table
-                curr_lba = unpack('<I', curr_raw[1 : 5])[0]
-                curr_len = unpack('<I', curr_raw[9 : 13])[0]
-                curr_fn_len = curr_raw[31]
-                curr_path = '%s%s' % (dir_path, curr_raw[32 : 32 + curr_fn_len].decode())
-                if (not only_root_dir) or (curr_path.count('/') == 1):
-                    yield (curr_path, curr_lba, curr_len)
+                    i += curr_len; continue # directory, so I'll handle it in the outer for-loop over the path table
+                curr_lba, curr_size = unpack_lba_size(dir_raw, i + 2)
+                curr_fn_len = dir_raw[i + 32]
+                curr_path = '%s%s' % (dir_path, dir_raw[i + 33 : i + 33 + curr_fn_len].decode())
+                i += curr_len
+                yield (curr_path, curr_lba, curr_size)
 
     # read the data of a given file (path, LBA, size) tuple
     def read_file(self, file_tup):
@@ -349,24 +434,67 @@ class ISO9660:
 
 # helper class to serve as a file pointer (to support GZIP, weird PSX discs, etc.)
 class ISO9660FP:
-    # constructor
+    # constructor (memory-map uncompressed files so seeks/reads are just slices; only the touched pages get loaded)
     def __init__(self, fn, mode='rb', start_offset=0, bufsize=DEFAULT_BUFSIZE):
         self.f = open_file(fn, mode, bufsize=bufsize)
-        self.mode = mode; self.start_offset = start_offset
+        self.mode = mode; self.start_offset = start_offset; self.mm = None; self.pos = 0
+        if isinstance(self.f, BufferedReader):
+            try:
+                from mmap import mmap, ACCESS_READ; self.mm = mmap(self.f.fileno(), 0, access=ACCESS_READ)
+                self.f.close() # the mapping keeps its own file descriptor, so free the buffered handle (and its read buffer)
+            except:
+                pass # e.g. block devices, empty files, or platforms without mmap: fall back to regular reads
 
     # seek to offset
     def seek(self, offset, from_what=0):
         if from_what == 0: # reference point is start of file
             offset += self.start_offset
-        self.f.seek(offset, from_what)
+        if self.mm is None:
+            self.f.seek(offset, from_what)
+        elif from_what == 0:
+            self.pos = offset
+        elif from_what == 1:
+            self.pos += offset
+        else:
+            self.pos = len(self.mm) + offset
 
     # tell current offset
     def tell(self):
-        return self.f.tell() - self.start_offset
+        if self.mm is None:
+            return self.f.tell() - self.start_offset
+        return self.pos - self.start_offset
+
+    # get total size of the underlying file (works for /dev/... volumes and GZIP files, like getsize())
+    def get_size(self):
+        if self.mm is not None:
+            return len(self.mm)
+        curr = self.f.tell(); size = self.f.seek(0, 2); self.f.seek(curr)
+        return size
+
+    # find the first occurrence of a byte string within the first `limit` bytes (-1 if not found)
+    def find(self, sub, limit):
+        if self.mm is None: # read in chunks (keeping enough of the previous chunk to catch matches that span two), so e.g. GZIP stops decompressing at the match
+            self.seek(0); pos = 0; tail = b''; tail_len = len(sub) - 1
+            while pos < limit:
+                chunk = self.read(min(ISO9660_FIND_CHUNK_SIZE, limit - pos))
+                if len(chunk) == 0:
+                    break
+                data = tail + chunk; i = data.find(sub)
+                if i != -1:
+                    return pos - len(tail) + i
+                tail = data[max(0, len(data) - tail_len):] if tail_len > 0 else b''; pos += len(chunk)
+            return -1
+        i = self.mm.find(sub, self.start_offset, self.start_offset + limit) # search the mapping in place, so pages after the match are never touched
+        if i != -1:
+            i -= self.start_offset
+        return i
 
     # read data
     def read(self, read_size):
-        return self.f.read(read_size)
+        if self.mm is None:
+            return self.f.read(read_size)
+        data = self.mm[self.pos : self.pos + read_size]; self.pos += len(data)
+        return data
 
 # get args from user interactively
 def get_args_interactive(argv):
@@ -384,7 +512,7 @@ def get_args_interactive(argv):
 
     # get console (--console)
     while arg_console is None:
-        print_log("Enter console (options: %s): " % ', '.join(GAMEID_CONSOLES), end='')
+        print_log("Enter console (options: %s): " % GAMEID_CONSOLES_STR, end='')
         arg_console = input().replace('"','').replace("'",'').strip().upper()
         if arg_console not in IDENTIFY:
             print_log("ERROR: Invalid console: %s\n" % arg_console); arg_console = None
@@ -399,13 +527,14 @@ def parse_args():
     # run argparse
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-i', '--input', required=True, type=str, help="Input Game File")
-    parser.add_argument('-c', '--console', required=True, type=str, help="Console (options: %s)" % ', '.join(GAMEID_CONSOLES))
-    parser.add_argument('-d', '--database', required=False, type=str, default=None, help="GameID Database (db.pkl.gz)")
+    parser.add_argument('-c', '--console', required=True, type=str, help="Console (options: %s)" % GAMEID_CONSOLES_STR)
+    parser.add_argument('-d', '--database', required=False, type=str, default=None, help="GameID Database (db_sections.pkl.gz or db.pkl.gz)")
     parser.add_argument('-o', '--output', required=False, type=str, default='stdout', help="Output File")
     parser.add_argument('--disc_uuid', required=False, type=str, default=None, help="Disc UUID (if already known)")
     parser.add_argument('--disc_label', required=False, type=str, default=None, help="Disc Label / Volume ID (if already known)")
     parser.add_argument('--delimiter', required=False, type=str, default='\t', help="Delimiter")
     parser.add_argument('--prefer_gamedb', action="store_true", help="Prefer Metadata in GameDB (rather than metadata loaded from game)")
+    parser.add_argument('--no_db_cache', action="store_true", help="Don't Cache an Uncompressed Copy of the GameID Database (also disabled by setting GAMEID_NO_DB_CACHE)")
     parser.add_argument('--version', action="store_true", help="Print GameID Version (%s)" % VERSION)
     args = parser.parse_args()
 
@@ -437,15 +566,82 @@ def parse_args():
     # all good, so return args
     return args
 
+# helper class to lazily unpickle each section (e.g. console) of the GameID database only when it's first accessed
+class GameIDDB(dict):
+    def __init__(self, sections):
+        dict.__init__(self, sections); self.loaded = set()
+
+    # get a section of the database (unpickle it if needed)
+    def __getitem__(self, k):
+        v = dict.__getitem__(self, k)
+        if k not in self.loaded:
+            if isinstance(v, bytes):
+                v = ploads(v)
+            else: # older databases store sections unpickled (shared by every load_db call), so copy the entries (identify_* functions modify them)
+                v = {ID:dict(entry) for ID, entry in v.items()}
+            dict.__setitem__(self, k, v); self.loaded.add(k)
+        return v
+
 # load GameID database
-def load_db(fn, internet_timeout=DEFAULT_INTERNET_TIMEOUT, bufsize=DEFAULT_BUFSIZE):
+def load_db(fn, internet_timeout=DEFAULT_INTERNET_TIMEOUT, bufsize=DEFAULT_BUFSIZE, db_cache=True):
     if fn is None:
         try:
-            from urllib.request import urlopen; return ploads(gdecompress(urlopen(DB_URL, timeout=internet_timeout).read()))
+            from urllib.request import urlopen
+            with urlopen(DB_URL, timeout=internet_timeout) as r, GzipFile(fileobj=r) as f:
+                return GameIDDB(pload(f)) # stream-decompress straight into the unpickler
         except:
-            fn = '%s/db.pkl.gz' % '/'.join(abspath(__file__).split('/')[:-1])
-    f = open_file(fn, 'rb', bufsize=bufsize); data = f.read(); f.close()
-    return ploads(data)
+            fn = '%s/db_sections.pkl.gz' % '/'.join(abspath(__file__).split('/')[:-1])
+    db_stat = stat(fn)
+    return GameIDDB(load_db_sections(fn, db_stat.st_mtime_ns, db_stat.st_size, bufsize=bufsize, db_cache=db_cache)) # new wrapper each time, so each load gets its own copy of a section
+
+# get the folder to keep uncompressed copies of GZIP databases in (None if they shouldn't be kept, e.g. GAMEID_NO_DB_CACHE is set, or under Pyodide, where the whole filesystem is in memory)
+def get_db_cache_dir():
+    if environ.get('GAMEID_NO_DB_CACHE') or sys.platform == 'emscripten':
+        return None
+    cache_home = environ.get('XDG_CACHE_HOME') or expanduser('~/.cache')
+    if cache_home.startswith('~'): # no home folder
+        return None
+    return join(cache_home, 'GameID')
+
+# load the (separately pickled) sections of a GameID database file, cached by path + modification time + size (e.g. the website runs main() many times in one process)
+@lru_cache(maxsize=4)
+def load_db_sections(fn, db_mtime_ns, db_size, bufsize=DEFAULT_BUFSIZE, db_cache=True):
+    # GZIP database: reuse an uncompressed copy (always in the sectioned layout) in the user's cache folder (skips decompression), named by the database's path, size, and modification time
+    cache_dir = get_db_cache_dir() if db_cache else None
+    if fn.lower().endswith('.gz') and cache_dir is not None:
+        cache_prefix = join(cache_dir, '%s.%08x' % (basename(fn)[:-3], crc32(abspath(fn).encode())))
+        cache_fn = '%s.%d.%d.cache' % (cache_prefix, db_size, db_mtime_ns)
+        try:
+            with open(cache_fn, 'rb', buffering=bufsize) as f:
+                return pload(f)
+        except OSError:
+            pass # no (readable) cache yet
+        except (UnpicklingError, EOFError) as e:
+            print_log("Ignoring invalid GameID database cache (%s): %s" % (e, cache_fn))
+        tmp_fn = '%s.%d' % (cache_fn, getpid())
+        try: # stream-decompress into a temporary file first, so a partially-written cache is never used
+            from shutil import copyfileobj
+            makedirs(cache_dir, exist_ok=True)
+            with open_file(fn, 'rb', bufsize=bufsize) as f_in, open(tmp_fn, 'w+b', buffering=bufsize) as f_tmp:
+                copyfileobj(f_in, f_tmp, bufsize); f_tmp.seek(0); db = pload(f_tmp)
+                if not all(isinstance(v, bytes) for v in db.values()): # older database (sections stored unpickled), so cache it in the sectioned layout
+                    f_tmp.seek(0); f_tmp.truncate(); pdump({k:(v if isinstance(v, bytes) else pdumps(v, protocol=5)) for k,v in db.items()}, f_tmp, protocol=5)
+            replace(tmp_fn, cache_fn)
+            for old_cache_fn in glob('%s.*.cache' % escape(cache_prefix)): # copies of older versions of this database
+                if old_cache_fn != cache_fn:
+                    remove(old_cache_fn)
+            return db
+        except OSError as e:
+            print_log("Unable to cache GameID database (set GAMEID_NO_DB_CACHE=1 or use --no_db_cache to disable caching): %s" % e)
+        finally:
+            try:
+                remove(tmp_fn)
+            except OSError:
+                pass # already renamed to the cache (or never created)
+
+    # other databases (or GZIP databases that aren't cached)
+    with open_file(fn, 'rb', bufsize=bufsize) as f:
+        return pload(f)
 
 # identify PSP game
 def identify_psp(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
@@ -464,12 +660,7 @@ def identify_psp(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=Fals
         error("Invalid PSP ISO: %s" % fn)
 
     # read serial
-    serial = ""
-    for v in data:
-        if v == ord('|'):
-            break
-        serial += chr(v)
-    serial = serial.strip()
+    serial = data.split(b'|', 1)[0].decode('latin-1').strip() # latin-1 maps each byte to the same code point (like chr)
 
     # prepare output
     out = {
@@ -495,7 +686,7 @@ def identify_psx_ps2(fn, db, console, user_uuid=None, user_volume_ID=None, prefe
         iso = MountedDisc(fn, uuid=user_uuid, volume_ID=user_volume_ID)
     else:
         error("File/folder not found: %s" % fn)
-    out = None; serial = None
+    out = None; serial = None; console_db = db[console] # look the section up once (GameIDDB.__getitem__ runs Python code)
 
     # try to find file in root directory with name SXXX_XXX.XX
     root_fns = [root_fn.lstrip('/') for root_fn, file_lba, file_len in iso.iter_files(only_root_dir=True)]
@@ -503,16 +694,21 @@ def identify_psx_ps2(fn, db, console, user_uuid=None, user_volume_ID=None, prefe
         if ';' in root_fns[i]:
             root_fns[i] = root_fns[i].split(';')[0]
     root_fns_upper = [s.strip().upper() for s in root_fns]
-    for prefix in db['GAMEID'][console]['ID_PREFIXES']:
-        for root_fn in root_fns_upper:
-            if root_fn.startswith(prefix):
-                serial = root_fn.replace('.','').replace('-','_')
-                if serial not in db[console] and len(serial) > len(prefix): # might have a different delimiter than '-' or '_' (e.g. DQ7 is 'SLUSP012.06)
-                    serial = serial[:len(prefix)] + '_' + serial[len(prefix)+1:]
-                if serial in db[console]:
-                    out = db[console][serial]; break
-        if serial is not None:
-            break
+    prefixes = tuple(db['GAMEID'][console]['ID_PREFIXES'])
+    candidate_fns = [root_fn for root_fn in root_fns_upper if root_fn.startswith(prefixes)] # check all prefixes at once in C, so most root files are skipped right away
+    if len(candidate_fns) != 0:
+        for prefix in prefixes:
+            prefix_len = len(prefix)
+            for root_fn in candidate_fns:
+                if root_fn.startswith(prefix):
+                    serial = root_fn.translate(PSX_PS2_SERIAL_TRANSLATE)
+                    if serial not in console_db and len(serial) > prefix_len: # might have a different delimiter than '-' or '_' (e.g. DQ7 is 'SLUSP012.06)
+                        serial = '%s_%s' % (serial[:prefix_len], serial[prefix_len+1:])
+                    out = console_db.get(serial)
+                    if out is not None:
+                        break
+            if serial is not None:
+                break
 
     # failed to find serial based on file, so try volume ID
     if out is None:
@@ -521,8 +717,7 @@ def identify_psx_ps2(fn, db, console, user_uuid=None, user_volume_ID=None, prefe
             serial = volume_ID.replace('-','_'); num_underscore = serial.count('_')
             if num_underscore == 2:
                 serial = '_'.join(serial.split('_')[:2])
-            if serial in db[console]:
-                out = db[console][serial]
+            out = console_db.get(serial)
 
     # failed to find serial based on file or volume ID, so try to identify with filename
     if out is None:
@@ -530,8 +725,7 @@ def identify_psx_ps2(fn, db, console, user_uuid=None, user_volume_ID=None, prefe
         if fn_no_ext.endswith('.gz'):
             fn_no_ext = fn_no_ext[:-3].strip()
         fn_no_ext = '.'.join(fn_no_ext.split('.')[:-1]).strip()
-        if fn_no_ext in db[console]:
-            out = db[console][fn_no_ext]
+        out = console_db.get(fn_no_ext)
 
     # finalize output and return
     if out is None:
@@ -556,7 +750,7 @@ def identify_ps2(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=Fals
 def identify_gb_gbc(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
     # parse GB/GBC ROM header: https://github.com/niemasd/GameDB-GB/wiki#memory-map
     f = open_file(fn, mode='rb'); data = f.read(); f.close()
-    if data[0x0104 : 0x0134] != GB_NINTENDO_LOGO:
+    if memoryview(data)[0x0104 : 0x0134] != GB_NINTENDO_LOGO: # memoryview to avoid copying the slice
         pass # error("Invalid GB/GBC ROM (Nintendo logo mismatch): %s" % fn)
     title = data[0x0134 : 0x013F]; manufacturer_code = data[0x013F : 0x0143]; cgb_flag = data[0x0143]
 
@@ -575,7 +769,7 @@ def identify_gb_gbc(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=F
         manufacturer_code = manufacturer_code.decode()
     else:
         title = data[0x0134 : 0x0144]; manufacturer_code = None
-    title = bytes([v if ord(' ') <= v <= ord('~') else ord(' ') for v in title]).decode().strip()
+    title = title.translate(NONPRINTABLE_TO_SPACE).decode().strip()
 
     # parse Super GameBoy support
     sgb_support = (data[0x0146] == 0x03)
@@ -614,15 +808,11 @@ def identify_gb_gbc(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=F
 
     # parse expected checksums
     header_checksum_expected = data[0x014D]
-    global_checksum_expected = unpack('>H', data[0x014E:0x0150])[0]
+    global_checksum_expected = UINT16_BE.unpack_from(data, 0x014E)[0]
 
     # calculate actual checksums
-    header_checksum_actual = 256
-    for v in data[0x0134 : 0x014D]:
-        header_checksum_actual -= (v+1)
-        while header_checksum_actual < 0:
-            header_checksum_actual += 256
-    global_checksum_actual = sum(v for i,v in enumerate(data) if i not in {0x014E, 0x014F}) % 65536
+    header_checksum_actual = (-sum(memoryview(data)[0x0134 : 0x014D]) - 0x19) & 0xFF # x = x - data[i] - 1 for each byte, mod 256
+    global_checksum_actual = (sum(data) - data[0x014E] - data[0x014F]) % 65536 # sum over bytes runs in C
 
     # identify game
     gamedb_ID = (title, global_checksum_expected)
@@ -637,10 +827,10 @@ def identify_gb_gbc(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=F
         'ram_banks': ram_banks,
         'licensee': licensee,
         'rom_version': rom_version,
-        'header_checksum_expected': '0x%s' % hex(header_checksum_expected)[2:].zfill(2),
-        'header_checksum_actual': '0x%s' % hex(header_checksum_actual)[2:].zfill(2),
-        'global_checksum_expected': '0x%s' % hex(global_checksum_expected)[2:].zfill(4),
-        'global_checksum_actual': '0x%s' % hex(global_checksum_actual)[2:].zfill(4),
+        'header_checksum_expected': header_checksum_expected,
+        'header_checksum_actual': header_checksum_actual,
+        'global_checksum_expected': global_checksum_expected,
+        'global_checksum_actual': global_checksum_actual,
     }
     if manufacturer_code is not None:
         out['manufacturer_code'] = manufacturer_code
@@ -657,11 +847,11 @@ def identify_gb_gbc(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=F
 def identify_gba(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
     # parse GBA ROM header: http://problemkaputt.de/gbatek-gba-cartridge-header.htm
     f = open_file(fn, mode='rb'); data = f.read(192); f.close()
-    if data[0x04 : 0xA0] != GBA_NINTENDO_LOGO:
+    if memoryview(data)[0x04 : 0xA0] != GBA_NINTENDO_LOGO: # memoryview to avoid copying the slice
         pass # error("Invalid GBA ROM (Nintendo logo mismatch): %s" % fn)
-    title = ''.join(chr(v) for v in data[0xA0 : 0xAC] if ord(' ') <= v <= ord('~')).strip()
-    game_code = ''.join(chr(v) for v in data[0xAC : 0xB0] if ord(' ') <= v <= ord('~')).strip()
-    maker_code = ''.join(chr(v) for v in data[0xB0 : 0xB2] if ord(' ') <= v <= ord('~')).strip()
+    title = data[0xA0 : 0xAC].translate(None, NONPRINTABLE_BYTES).decode().strip()
+    game_code = data[0xAC : 0xB0].translate(None, NONPRINTABLE_BYTES).decode().strip()
+    maker_code = data[0xB0 : 0xB2].translate(None, NONPRINTABLE_BYTES).decode().strip()
     main_unit_code = data[0xB3]
     device_type = data[0xB4]
     software_version = data[0xBC]
@@ -671,8 +861,8 @@ def identify_gba(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=Fals
         'ID': game_code,
         'internal_title': title,
         'maker_code': maker_code,
-        'main_unit_code': '0x%s' % hex(main_unit_code)[2:].zfill(2),
-        'device_type': '0x%s' % hex(device_type)[2:].zfill(2),
+        'main_unit_code': main_unit_code,
+        'device_type': device_type,
         'software_version': software_version,
     }
     if game_code in db['GBA']:
@@ -709,98 +899,59 @@ def identify_gc(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False
 
 # identify SegaCD game
 def identify_segacd(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
-    # read SegaCD ISO header
-    if get_extension(fn) == 'cue':
-        f = open_file(bins_from_cue(fn)[0], 'rb')
-    else:
-        f = open_file(fn, mode='rb')
-    header = f.read(0x300); f.close() # 0x300 is arbitrary; too small = won't find SegaCD magic word; must be > 0x20F (length of the header)
+    # read SegaCD ISO header (reuse the ISO's file pointer to avoid opening the first track twice)
     iso = ISO9660(fn)
+    iso.f.seek(0); header = iso.f.read(0x300) # 0x300 is arbitrary; too small = won't find SegaCD magic word; must be > 0x20F (length of the header)
 
     # search for header starting offset
-    magic_word_ind = None
-    for magic_word in SEGACD_MAGIC_WORDS:
-        for i in range(len(header) - len(magic_word) + 1):
-            if header[i : i + len(magic_word)] == magic_word:
-                magic_word_ind = i; break
-        if magic_word_ind is not None:
-            break
-    if magic_word_ind is None:
+    magic_word_match = SEGACD_MAGIC_WORDS_REGEX.search(header)
+    if magic_word_match is None:
         return None # fail if magic word not found (in the future, maybe change to default offset?)
+    magic_word_ind = magic_word_match.start()
 
     # set up output dictionary
     out = {
-        'disc_ID':          header[magic_word_ind + 0x000 : magic_word_ind + 0x010],
-        'disc_volume_name': header[magic_word_ind + 0x010 : magic_word_ind + 0x01B],
-        'system_name':      header[magic_word_ind + 0x020 : magic_word_ind + 0x02B],
-        'build_date':       header[magic_word_ind + 0x050 : magic_word_ind + 0x058],
-        'system_type':      header[magic_word_ind + 0x100 : magic_word_ind + 0x110],
-        'release_year':     header[magic_word_ind + 0x118 : magic_word_ind + 0x11C],
-        'release_month':    header[magic_word_ind + 0x11D : magic_word_ind + 0x120],
-        'title_domestic':   header[magic_word_ind + 0x120 : magic_word_ind + 0x150],
-        'title_overseas':   header[magic_word_ind + 0x150 : magic_word_ind + 0x180],
-        'ID':               header[magic_word_ind + 0x180 : magic_word_ind + 0x190],
-        'device_support':   header[magic_word_ind + 0x190 : magic_word_ind + 0x1A0],
+        'disc_ID':          try_decode(header[magic_word_ind + 0x000 : magic_word_ind + 0x010]),
+        'disc_volume_name': try_decode(header[magic_word_ind + 0x010 : magic_word_ind + 0x01B]),
+        'system_name':      try_decode(header[magic_word_ind + 0x020 : magic_word_ind + 0x02B]),
+        'build_date':       try_decode(header[magic_word_ind + 0x050 : magic_word_ind + 0x058]),
+        'system_type':      try_decode(header[magic_word_ind + 0x100 : magic_word_ind + 0x110]),
+        'release_year':     try_decode(header[magic_word_ind + 0x118 : magic_word_ind + 0x11C]),
+        'release_month':    try_decode(header[magic_word_ind + 0x11D : magic_word_ind + 0x120]),
+        'title_domestic':   try_decode(header[magic_word_ind + 0x120 : magic_word_ind + 0x150]),
+        'title_overseas':   try_decode(header[magic_word_ind + 0x150 : magic_word_ind + 0x180]),
+        'ID':               try_decode(header[magic_word_ind + 0x180 : magic_word_ind + 0x190]),
+        'device_support':   try_decode(header[magic_word_ind + 0x190 : magic_word_ind + 0x1A0]),
         'uuid':             iso.get_uuid(),
         'volume_ID':        iso.get_volume_ID(),
     }
 
-    # try to parse output as strings
-    for k in list(out.keys()):
-        if isinstance(out[k], bytes):
-            try:
-                out[k] = out[k].decode().strip()
-            except:
-                pass
-
     # handle build date (MMDDYYYY)
     if isinstance(out['build_date'], str):
         out['build_date'] = '%s-%s-%s' % (out['build_date'][4:8], out['build_date'][0:2], out['build_date'][2:4])
 
-    # release year
+    # release year (already decoded above)
     try:
-        out['release_year'] = int(out['release_year'].decode())
+        out['release_year'] = int(out['release_year'])
     except:
         pass
 
-    # release month
-    try:
-        out['release_month'] = out['release_month'].decode().strip()
-    except:
-        pass
+    # release month (already decoded above)
     if out['release_month'] in MONTH_3LET_TO_FULL:
         out['release_month'] = MONTH_3LET_TO_FULL[out['release_month']]
 
     # device support
     try:
-        tmp = list()
-        for c in out['device_support']:
-            if c in GENESIS_DEVICE_SUPPORT:
-                tmp.append(GENESIS_DEVICE_SUPPORT[c])
-            else:
-                tmp.append(c)
-        out['device_support'] = ' / '.join(s for s in sorted(tmp))
-    except:
+        out['device_support'] = ' / '.join(sorted(GENESIS_DEVICE_SUPPORT.get(c, c) for c in out['device_support']))
+    except: # failed to decode as string
         pass
 
     # region support
-    out['region_support'] = header[magic_word_ind + 0x1F0 : magic_word_ind + 0x1F3]
-    try:
-        tmp = list()
-        for v in out['region_support']:
-            if v < ord('!') or v > ord('~'):
-                continue
-            c = chr(v)
-            if c in GENESIS_REGION_SUPPORT:
-                tmp.append(GENESIS_REGION_SUPPORT[c])
-            else:
-                tmp.append(c)
-        out['region_support'] = ' / '.join(s for s in sorted(tmp))
-    except:
-        pass
+    region_support = header[magic_word_ind + 0x1F0 : magic_word_ind + 0x1F3]
+    out['region_support'] = ' / '.join(sorted(GENESIS_REGION_SUPPORT.get(chr(v), chr(v)) for v in region_support if ord('!') <= v <= ord('~')))
 
     # identify game
-    serial = out['ID'].replace('#','').replace('-','').replace(' ','').strip()
+    serial = out['ID'].translate(SEGACD_SERIAL_TRANSLATE).strip()
     if serial in db['SegaCD']:
         gamedb_entry = db['SegaCD'][serial]
         for k,v in gamedb_entry.items():
@@ -820,10 +971,9 @@ def identify_saturn(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=F
     header = f.read(0x100); f.close() # 0x100 is arbitrary; too small = won't find Saturn magic word
 
     # search for header starting offset
-    magic_word_ind = None
-    for i in range(len(header) - len(SATURN_MAGIC_WORD) + 1):
-        if header[i : i + len(SATURN_MAGIC_WORD)] == SATURN_MAGIC_WORD:
-            magic_word_ind = i; break
+    magic_word_ind = header.find(SATURN_MAGIC_WORD)
+    if magic_word_ind == -1:
+        magic_word_ind = None
     if magic_word_ind is None:
         return None # fail if magic word not found (in the future, maybe change to default offset?)
 
@@ -838,7 +988,7 @@ def identify_saturn(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=F
         out['internal_title'] = header[magic_word_ind + 0x60 : magic_word_ind + 0xD0].decode().strip()
     except:
         out['internal_title'] = header[magic_word_ind + 0x60 : magic_word_ind + 0xD0]
-    serial = out['ID'].replace('-','').replace(' ','').strip()
+    serial = out['ID'].translate(SATURN_SERIAL_TRANSLATE).strip()
 
     # handle release date
     yyyymmdd = header[magic_word_ind + 0x30 : magic_word_ind + 0x38].decode().strip()
@@ -873,17 +1023,17 @@ def n64_convert_endianness(data):
     if len(data) % 2 != 0:
         error("Can only convert even-length data")
     out = bytearray(len(data))
-    for i in range(0, len(data), 2):
-        out[i] = data[i+1]; out[i+1] = data[i]
+    out[0::2] = data[1::2]; out[1::2] = data[0::2] # extended slice assignment swaps all pairs in C
     return out
 
 # identify N64 game
 def identify_n64(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
-    f = open_file(fn, mode='rb'); header = f.read(0x40) # stop before "Boot code/strap"
+    with open_file(fn, mode='rb') as f:
+        header = f.read(0x40) # stop before "Boot code/strap"
 
     # determine endianness from first word: https://en64.shoutwiki.com/wiki/ROM
     first_word_data = header[0 : 4]
-    if n64_convert_endianness(first_word_data) == N64_FIRST_WORD: # little-endian, so need to convert to big-endian
+    if first_word_data == N64_FIRST_WORD_BYTESWAPPED: # little-endian, so need to convert to big-endian
         header = n64_convert_endianness(header)
     elif first_word_data != N64_FIRST_WORD: # doesn't match either endianness
         error("Invalid N64 ROM: %s" % fn)
@@ -892,56 +1042,47 @@ def identify_n64(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=Fals
     cartridge_ID = header[0x3c : 0x3e]
     country_code, version = header[0x3e : 0x40]
 
-    # identify game
-    try:
-        serial = '%s%s%s' % (chr(cartridge_ID[0]), chr(cartridge_ID[1]), chr(country_code))
-    except:
-        error("Invalid N64 ROM (%s %s): %s" % (cartridge_ID, country_code, fn))
-    if serial in db['N64']:
-        out = db['N64'][serial]
+    # identify game (serial = cartridge ID + country code; latin-1 maps each byte to the same character chr() would)
+    serial = header[0x3c : 0x3f].decode('latin-1')
+    out = db['N64'].get(serial)
+    if out is not None:
         out['ID'] = serial
         if not prefer_gamedb:
-            internal_name = header[0x20 : 0x34]
-            try:
-                out['title'] = internal_name.decode().strip()
-            except:
-                out['title'] = internal_name
-        f.close()
+            out['title'] = try_decode(header[0x20 : 0x34]) # internal name
         return out
-    f.close(); error("N64 game not found (%s %s): %s" % (cartridge_ID, country_code, fn))
+    error("N64 game not found (%s %s): %s" % (cartridge_ID, country_code, fn))
 
 # identify SNES game
 def identify_snes(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
-    # load ROM and remove optional 512-byte header: https://snes.nesdev.org/wiki/ROM_file_formats#Detecting_Headered_ROM
-    f = open_file(fn, mode='rb'); data = f.read(); f.close()
-    if (len(data) % 1024) == 512:
-        data = data[512:]
+    # skip optional 512-byte header (without reading the whole ROM; size comes from the open handle): https://snes.nesdev.org/wiki/ROM_file_formats#Detecting_Headered_ROM
+    f = open_file(fn, mode='rb')
+    if (f.seek(0, 2) % 1024) == 512:
+        rom_offset = 512
+    else:
+        rom_offset = 0
 
     # find header start: https://github.com/JonnyWalker/PySNES/blob/13ed51843ef391426ebecae643f955da232dcf33/venv/pysnes/cartrige.py#L71-L83
     checksum = None; header_start =  None
     try:
         for start_addr in [SNES_LOROM_HEADER_START, SNES_HIROM_HEADER_START]:
+            # only read the 32-byte header candidate, plus the byte right before it ($FFBF, used for coprocessor detection)
+            f.seek(rom_offset + start_addr - 1); data = f.read(33)
+            prev_byte = data[0]; data = data[1:]
+
             # https://github.com/JonnyWalker/PySNES/blob/13ed51843ef391426ebecae643f955da232dcf33/venv/pysnes/cartrige.py#L85-L99
-            cs1 = hex(data[start_addr + 30])[2:]
-            cs1 = (2 - len(cs1)) * "0" + cs1
-            cs2 = hex(data[start_addr + 31])[2:]
-            cs2 = (2 - len(cs2)) * "0" + cs2
-            checksum = cs2 + cs1
-            csc1 = hex(data[start_addr + 28])[2:]
-            csc1 = (2 - len(csc1)) * "0" + csc1
-            csc2 = hex(data[start_addr + 29])[2:]
-            csc2 = (2 - len(csc2)) * "0" + csc2
-            checksum_complement = csc2 + csc1
-            if (int(checksum, 16) + int(checksum_complement, 16) == 65535):
+            checksum = data[30] | (data[31] << 8) # little-endian
+            checksum_complement = data[28] | (data[29] << 8) # little-endian
+            if (checksum + checksum_complement) == 65535:
                 header_start = start_addr; break
     except:
         pass
+    f.close()
     if header_start is None:
         error("Invalid SNES ROM: %s" % fn)
 
     # parse SNES ROM header: https://snes.nesdev.org/wiki/ROM_header#Cartridge_header
-    header = data[header_start:]
-    internal_name = header[0 : 21]; internal_name_hex_string = '0x%s' % ''.join(hex(v)[2:].zfill(2) for v in internal_name)
+    header = data
+    internal_name = header[0 : 21]; internal_name_hex_string = '0x%s' % internal_name.hex()
     developer_ID = header[26]
     rom_version = header[27]
 
@@ -960,32 +1101,30 @@ def identify_snes(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=Fal
     # https://snes.nesdev.org/wiki/ROM_header#$FFD6
     hardware = None
     if header[22] <= 2: # [0x00, 0x01, 0x02]
-        hardware = ["ROM", "ROM + RAM", "ROM + RAM + Battery"][header[22]]
+        hardware = SNES_HARDWARE[header[22]]
     else:
-        tmp = hex(header[22]).lower() # $FFD6
-        coprocessor = None
-        if '3' <= tmp[-1] <= '6': # [0x?3, 0x?4, 0x?5, 0x?6]
-            hardware = ["ROM + Coprocessor", "ROM + Coprocessor + RAM", "ROM + Coprocessor + RAM + Battery", "ROM + Coprocessor + Battery"][int(tmp[-1])-3]
-        if '0' <= tmp[-2] <= '5': # [0x0?, 0x1?, 0x2?, 0x3?, 0x4?, 0x5?]
-            coprocessor = ["DSP", "GSU / SuperFX", "OBC1", "SA-1", "S-DD1", "S-RTC"][int(tmp[-2])]
-        elif tmp[-2] == 'e': # 0xe?
+        hardware_nibble = header[22] & 0x0F; coprocessor_nibble = header[22] >> 4; coprocessor = None # $FFD6
+        if 0x3 <= hardware_nibble <= 0x6: # [0x?3, 0x?4, 0x?5, 0x?6]
+            hardware = SNES_HARDWARE_COPROCESSOR[hardware_nibble - 0x3]
+        if coprocessor_nibble <= 0x5: # [0x0?, 0x1?, 0x2?, 0x3?, 0x4?, 0x5?]
+            coprocessor = SNES_COPROCESSORS[coprocessor_nibble]
+        elif coprocessor_nibble == 0xE: # 0xe?
             coprocessor = "Super Game Boy / Satellaview"
-        elif tmp[-2] == 'f': # 0xf?
-            tmp = hex(data[header_start-1]) # $FFBF
-            if (tmp[-2] == '0') and ('0' <= tmp[-1] <= '3'): # [0x00, 0x01, 0x02, 0x03]
-                coprocessor = ["SPC7110", "ST010 / ST011", "ST018", "CX4"][int(tmp[-1])]
+        elif coprocessor_nibble == 0xF: # 0xf?
+            if prev_byte <= 0x03: # $FFBF: [0x00, 0x01, 0x02, 0x03]
+                coprocessor = SNES_COPROCESSORS_CUSTOM[prev_byte]
         if hardware is not None and coprocessor is not None:
             hardware = hardware.replace(" + Coprocessor", " + Coprocessor (%s)" % coprocessor)
 
     # identify game
-    gamedb_ID = (developer_ID, internal_name_hex_string, rom_version, int(checksum,16))
+    gamedb_ID = (developer_ID, internal_name_hex_string, rom_version, checksum)
     out = {
         'internal_title': internal_name_hex_string,
         'fast_slow_rom': fast_slow_rom,
         'rom_type': rom_type,
-        'developer_ID': '0x%s' % hex(developer_ID)[2:].zfill(2),
+        'developer_ID': developer_ID,
         'rom_version': rom_version,
-        'checksum': '0x%s' % checksum.zfill(4),
+        'checksum': checksum,
     }
     if hardware is not None:
         out['hardware'] = hardware
@@ -995,65 +1134,49 @@ def identify_snes(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=Fal
             if (k not in out) or prefer_gamedb:
                 out[k] = v
     else:
-        out['title'] = ''.join(chr(v) if ord(' ') <= v <= ord('~') else ' ' for v in internal_name).strip()
+        out['title'] = internal_name.translate(NONPRINTABLE_TO_SPACE).decode().strip()
     return out
 
 # identify Genesis game
 def identify_genesis(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=False):
     # parse Genesis ROM header: https://plutiedev.com/rom-header
-    f = open_file(fn, mode='rb'); data = f.read(); f.close()
+    f = open_file(fn, mode='rb'); data = f.read(0x400); f.close() # header starts in [0x100, 0x200) and is 0x100 bytes long, so don't read the whole ROM
 
     # search for header starting offset
-    magic_word_ind = None
-    for magic_word in GENESIS_MAGIC_WORDS:
-        for i in range(0x100, 0x200): # # 0x200 is arbitrary; too big = slow if not a Genesis game
-            if data[i : i + len(magic_word)] == magic_word:
-                magic_word_ind = i; break
-        if magic_word_ind is not None:
-            break
-    if magic_word_ind is None:
+    magic_word_match = GENESIS_MAGIC_WORDS_REGEX.search(data, 0x100, 0x200 + GENESIS_MAGIC_WORDS_MAX_LEN - 1) # 0x200 is arbitrary; too big = slow if not a Genesis game
+    if magic_word_match is None or magic_word_match.start() >= 0x200: # match must start in [0x100, 0x200)
         return None # fail if magic word not found (in the future, maybe change to default offset?)
+    magic_word_ind = magic_word_match.start()
+    rom_start, rom_end, ram_start, ram_end = GENESIS_ROM_RAM_RANGES.unpack_from(data, magic_word_ind + 0x0A0)
 
     # set up output dictionary
     out = {
-        'system_type':    data[magic_word_ind + 0x000 : magic_word_ind + 0x010],
-        'publisher':      data[magic_word_ind + 0x013 : magic_word_ind + 0x017],
-        'release_year':   data[magic_word_ind + 0x018 : magic_word_ind + 0x01C],
-        'release_month':  data[magic_word_ind + 0x01D : magic_word_ind + 0x020],
-        'title_domestic': data[magic_word_ind + 0x020 : magic_word_ind + 0x050],
-        'title_overseas': data[magic_word_ind + 0x050 : magic_word_ind + 0x080],
-        'software_type':  data[magic_word_ind + 0x080 : magic_word_ind + 0x082],
-        'ID':             data[magic_word_ind + 0x082 : magic_word_ind + 0x08B],
-        'revision':       data[magic_word_ind + 0x08C : magic_word_ind + 0x08E],
-        'checksum':       hex(unpack('>H', data[magic_word_ind + 0x08E : magic_word_ind + 0x090])[0]),
-        'device_support': data[magic_word_ind + 0x090 : magic_word_ind + 0x0A0],
-        'rom_start':      hex(unpack('>I', data[magic_word_ind + 0x0A0 : magic_word_ind + 0x0A4])[0]),
-        'rom_end':        hex(unpack('>I', data[magic_word_ind + 0x0A4 : magic_word_ind + 0x0A8])[0]),
-        'ram_start':      hex(unpack('>I', data[magic_word_ind + 0x0A8 : magic_word_ind + 0x0AC])[0]),
-        'ram_end':        hex(unpack('>I', data[magic_word_ind + 0x0AC : magic_word_ind + 0x0B0])[0]),
-        'modem_support':  data[magic_word_ind + 0x0BC : magic_word_ind + 0x0C8],
-        'region_support': data[magic_word_ind + 0x0F0 : magic_word_ind + 0x0F3],
+        'system_type':    try_decode(data[magic_word_ind + 0x000 : magic_word_ind + 0x010]),
+        'publisher':      try_decode(data[magic_word_ind + 0x013 : magic_word_ind + 0x017]),
+        'release_year':   try_decode(data[magic_word_ind + 0x018 : magic_word_ind + 0x01C]),
+        'release_month':  try_decode(data[magic_word_ind + 0x01D : magic_word_ind + 0x020]),
+        'title_domestic': try_decode(data[magic_word_ind + 0x020 : magic_word_ind + 0x050]),
+        'title_overseas': try_decode(data[magic_word_ind + 0x050 : magic_word_ind + 0x080]),
+        'software_type':  try_decode(data[magic_word_ind + 0x080 : magic_word_ind + 0x082]),
+        'ID':             try_decode(data[magic_word_ind + 0x082 : magic_word_ind + 0x08B]),
+        'revision':       try_decode(data[magic_word_ind + 0x08C : magic_word_ind + 0x08E]),
+        'checksum':       hex(UINT16_BE.unpack_from(data, magic_word_ind + 0x08E)[0]),
+        'device_support': try_decode(data[magic_word_ind + 0x090 : magic_word_ind + 0x0A0]),
+        'rom_start':      hex(rom_start),
+        'rom_end':        hex(rom_end),
+        'ram_start':      hex(ram_start),
+        'ram_end':        hex(ram_end),
+        'modem_support':  try_decode(data[magic_word_ind + 0x0BC : magic_word_ind + 0x0C8]),
+        'region_support': try_decode(data[magic_word_ind + 0x0F0 : magic_word_ind + 0x0F3]),
     }
 
-    # try to parse output as strings
-    for k in list(out.keys()):
-        if isinstance(out[k], bytes):
-            try:
-                out[k] = out[k].decode().strip()
-            except:
-                pass
-
-    # release year
+    # release year (already decoded above)
     try:
-        out['release_year'] = int(out['release_year'].decode())
+        out['release_year'] = int(out['release_year'])
     except:
         pass
 
-    # release month
-    try:
-        out['release_month'] = out['release_month'].decode().strip()
-    except:
-        pass
+    # release month (already decoded above)
     if out['release_month'] in MONTH_3LET_TO_FULL:
         out['release_month'] = MONTH_3LET_TO_FULL[out['release_month']]
 
@@ -1063,31 +1186,19 @@ def identify_genesis(fn, db, user_uuid=None, user_volume_ID=None, prefer_gamedb=
 
     # device support
     try:
-        tmp = list()
-        for c in out['device_support']:
-            if c in GENESIS_DEVICE_SUPPORT:
-                tmp.append(GENESIS_DEVICE_SUPPORT[c])
-            else:
-                tmp.append(c)
-        out['device_support'] = ' / '.join(s for s in sorted(tmp))
-    except:
+        out['device_support'] = ' / '.join(sorted(GENESIS_DEVICE_SUPPORT.get(c, c) for c in out['device_support']))
+    except: # failed to decode as string
         pass
 
     # region support
     try:
-        tmp = list()
-        for c in out['region_support']:
-            if c in GENESIS_REGION_SUPPORT:
-                tmp.append(GENESIS_REGION_SUPPORT[c])
-            else:
-                tmp.append(c)
-        out['region_support'] = ' / '.join(s for s in sorted(tmp))
-    except:
+        out['region_support'] = ' / '.join(sorted(GENESIS_REGION_SUPPORT.get(c, c) for c in out['region_support']))
+    except: # failed to decode as string
         pass
 
     # identify game
     if isinstance(out['ID'], str):
-        serial = ''.join(c if c in SAFE else '_' for c in out['ID']).replace('-','')
+        serial = out['ID'].translate(GENESIS_SERIAL_TRANSLATE)
         if serial in db['Genesis']:
             gamedb_entry = db['Genesis'][serial]
             for k,v in gamedb_entry.items():
@@ -1144,23 +1255,26 @@ IDENTIFY = {
     'SNES':      identify_snes,
 }
 GAMEID_CONSOLES = sorted(IDENTIFY.keys())
+GAMEID_CONSOLES_STR = ', '.join(GAMEID_CONSOLES) # joined once for help text, prompts, and error messages
 IDENTIFY = {k.upper():v for k,v in IDENTIFY.items()} # upper-case for case-insensitivity
 
 # throw an error for unsupported consoles
 def check_console(console):
     if console.upper() not in IDENTIFY:
-        error("Invalid console: %s\nOptions: %s" % (console, ', '.join(GAMEID_CONSOLES)))
+        error("Invalid console: %s\nOptions: %s" % (console, GAMEID_CONSOLES_STR))
 
 # main program logic
 def main():
     args = parse_args()
-    db = load_db(args.database)
+    db = load_db(args.database, db_cache=not args.no_db_cache)
     meta = IDENTIFY[args.console](args.input, db, user_uuid=args.disc_uuid, user_volume_ID=args.disc_label, prefer_gamedb=args.prefer_gamedb)
     if meta is None:
         error("%s game not found: %s" % (args.console, args.input))
-    for k,v in meta.items(): # replace empty string values with 'None'
-        if isinstance(v, str) and len(v.strip()) == 0:
+    for k,v in meta.items():
+        if isinstance(v, str) and len(v.strip()) == 0: # replace empty string values with 'None'
             meta[k] = 'None'
+        elif k in HEX_FIELDS and isinstance(v, int): # format int fields as hex (only done here, as GameDB values may replace them)
+            meta[k] = '0x%0*x' % (HEX_FIELDS[k], v)
     f_out = open_file(args.output, 'wt')
     print('\n'.join('%s%s%s' % (k,args.delimiter,v) for k,v in meta.items()), file=f_out)
     f_out.close()
@@ -4,9 +4,13 @@ Build a local game database using GameDB
 '''
 
 # imports
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from gzip import open as gopen
+from io import TextIOWrapper
 from os.path import isdir, isfile
 from pickle import dump as pdump
+from pickle import dumps as pdumps
 from sys import argv
 from urllib.request import urlopen
 
@@ -17,10 +21,11 @@ CONSOLES = {'GB', 'GBA', 'GBC', 'GC', 'Genesis', 'N64', 'NeoGeoCD', 'PSP', 'PSX'
 def get_url(console):
     return 'https://github.com/niemasd/GameDB-%s/releases/latest/download/%s.data.tsv' % (console, console)
 
-# iterate over rows of a GameDB data.tsv file
+# iterate over rows of a GameDB data.tsv file (decode the response line-by-line as it streams in, rather than holding the whole file)
 def iter_gamedb_data_tsv(console):
-    for line in urlopen(get_url(console)).read().decode().splitlines():
-        yield [v.strip() for v in line.split('\t')]
+    with urlopen(get_url(console)) as r:
+        for line in TextIOWrapper(r, encoding='utf-8'):
+            yield [v.strip() for v in line.split('\t')]
 
 # load GameDB database
 def load_gamedb(console):
@@ -37,18 +42,21 @@ def load_gamedb(console):
 # main program
 if __name__ == "__main__":
     # check user arguments
-    if len(argv) != 2 or argv[1].strip().lower() in {'-h', '--help'}:
-        print("USAGE: %s <output_GameID_db.pkl.gz>" % argv[0]); exit(1)
+    if len(argv) not in {2, 3} or argv[1].strip().lower() in {'-h', '--help'} or (len(argv) == 3 and argv[2] != '--sections'):
+        print("USAGE: %s <output_GameID_db.pkl.gz> [--sections]" % argv[0]); exit(1)
     if isfile(argv[1]) or isdir(argv[1]):
         print("Output file exists: %s" % argv[1]); exit(1)
-    if not argv[1].lower().endswith('.pkl') and not argv[1].lower().endswith('.pkl.gz'):
-        print("Invalid output file extension (must be .pkl or .pkl.gz): %s" % argv[1]); exit(1)
+    if not argv[1].lower().endswith(('.pkl', '.pkl.gz', '.pkl.zst')):
+        print("Invalid output file extension (must be .pkl, .pkl.gz, or .pkl.zst): %s" % argv[1]); exit(1)
 
-    # load GameDB databases
-    db = {'GAMEID': dict()}
-    for console in sorted(CONSOLES):
+    # load GameDB databases (each one is just a download + parse, so fetch them all in parallel threads)
+    db = {'GAMEID': dict()}; consoles = sorted(CONSOLES)
+    for console in consoles:
         print("Loading GameDB-%s..." % console)
-        db[console] = load_gamedb(console) # load GameDB
+    with ThreadPoolExecutor(max_workers=len(consoles)) as executor:
+        gamedbs = list(executor.map(load_gamedb, consoles))
+    for console, gamedb in zip(consoles, gamedbs):
+        db[console] = gamedb # load GameDB
         db['GAMEID'][console] = dict() # just in case I need to preprocess stuff for this console
 
     # merge GB/GBC
@@ -84,13 +92,8 @@ if __name__ == "__main__":
                 db[console][db[console][k]['redump_name']] = db[console][k]
 
         # preprocess PSX/PS2 serial beginnings for speed in GameID (sorted in decreasing order of frequency)
-        counts = dict()
-        for ID in db[console]:
-            prefix = ID.split('_')[0].strip()
-            if prefix not in counts:
-                counts[prefix] = 0
-            counts[prefix] += 1
-        db['GAMEID'][console]['ID_PREFIXES'] = sorted(counts.keys(), key=lambda x: counts[x], reverse=True)
+        counts = Counter(ID.split('_', 1)[0].strip() for ID in db[console])
+        db['GAMEID'][console]['ID_PREFIXES'] = [prefix for prefix, count in counts.most_common()]
 
     # fix Saturn (delete spaces and dashes)
     print("Fixing Saturn database...")
@@ -104,10 +107,17 @@ if __name__ == "__main__":
     print("Fixing SNES database...")
     db['SNES'] = {(int(v['developer_ID'],0), v['internal_title'], int(v['rom_version'],0), int(v['checksum'],0)):v for k,v in db['SNES'].items()}
 
+    # pickle each section separately so GameID only has to unpickle the console it's identifying (only if requested, as older GameID versions can't read this layout)
+    if len(argv) == 3:
+        print("Pickling GameID database sections...")
+        db = {k:pdumps(v, protocol=5) for k,v in db.items()}
+
     # dump GameID database
     print("Writing GameID database: %s" % argv[1])
     if argv[1].lower().endswith('.gz'):
         f = gopen(argv[1], 'wb', compresslevel=9)
+    elif argv[1].lower().endswith('.zst'):
+        from compression.zstd import open as zopen; f = zopen(argv[1], 'wb', level=19)
     else:
         f = open(argv[1], 'wb')
-    pdump(db, f); f.close()
+    pdump(db, f, protocol=5); f.close()
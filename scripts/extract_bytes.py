@@ -2,81 +2,153 @@
 '''
 Extract bytes from a disc image (or general file)
 '''
+from bisect import bisect_left
 from gzip import open as gopen
-from os.path import abspath, expanduser, getsize, isfile
-import argparse
+from io import BufferedWriter
+from itertools import accumulate
+from os.path import abspath, dirname, expanduser, getsize, isfile, join
+from types import SimpleNamespace
+import sys
 DEFAULT_BUFSIZE = 1000000
+DEFAULT_GZIP_LEVEL = 6 # level 9 is much slower for barely smaller output
+CUE_FILE_PATTERN = r'^\s*FILE\s+"([^"]+)"' # quoted filename of a FILE line of a CUE (compiled only for CUE inputs, as importing re is a big part of startup)
+FAST_ARGS = ['-i', '-s', '-n', '-o'] # argument order handled without argparse
 
-# parse user args
-def parse_args():
+# parse user args (from the command line if `argv` isn't given)
+def parse_args(argv=None):
+    # fast path for plain `-i <input> -s <start> -n <num_bytes> [-o <output>]` calls (importing + building argparse is a big part of the runtime of small extractions)
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) in {6, 8} and argv[0::2] == FAST_ARGS[:len(argv)//2]:
+        return SimpleNamespace(input=argv[1], start=argv[3], num_bytes=argv[5], output=argv[7] if len(argv) == 8 else 'stdout', gzip_level=DEFAULT_GZIP_LEVEL)
+
+    # anything else (e.g. long option names, -l, -h): use argparse
+    import argparse
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-i', '--input', required=True, type=str, help="Input File")
     parser.add_argument('-s', '--start', required=True, type=str, help="Starting Offset to Read")
     parser.add_argument('-n', '--num_bytes', required=True, type=str, help="Number of Bytes to Read")
     parser.add_argument('-o', '--output', required=False, type=str, default='stdout', help="Output File")
-    args = parser.parse_args()
+    parser.add_argument('-l', '--gzip_level', required=False, type=int, default=DEFAULT_GZIP_LEVEL, help="GZIP Compression Level (if Output File is .gz)")
+    args = parser.parse_args(argv)
     return args
 
 # open an output text file for writing (automatically handle gzip)
-def open_output(fn, bufsize=DEFAULT_BUFSIZE):
+def open_output(fn, bufsize=DEFAULT_BUFSIZE, gzip_level=DEFAULT_GZIP_LEVEL):
     if fn == 'stdout':
         from sys import stdout; f_out = stdout.buffer
     elif fn.strip().lower().endswith('.gz'):
-        f_out = gopen(fn, 'wb', compresslevel=9)
+        f_out = gopen(fn, 'wb', compresslevel=gzip_level)
     else:
         f_out = open(fn, 'wb', buffering=bufsize)
     return f_out
 
+# copy up to `num_bytes` bytes from the current position of `f_in` to `f_out`, and return how many bytes were copied
+def copy_bytes(f_in, f_out, num_bytes, buf):
+    copied = 0
+
+    # hint that this range will be read sequentially, so the OS can read ahead more aggressively (if supported)
+    try:
+        from os import posix_fadvise, POSIX_FADV_SEQUENTIAL
+        posix_fadvise(f_in.fileno(), f_in.tell(), num_bytes, POSIX_FADV_SEQUENTIAL)
+    except (ImportError, OSError):
+        pass
+
+    # regular output files/pipes: have the kernel copy the bytes directly (no copying through Python)
+    if isinstance(f_out, BufferedWriter):
+        try:
+            from os import sendfile
+            f_out.flush(); in_fd = f_in.fileno(); out_fd = f_out.fileno(); offset = f_in.tell()
+            while copied < num_bytes:
+                n = sendfile(out_fd, in_fd, offset + copied, num_bytes - copied)
+                if n == 0:
+                    break
+                copied += n
+            f_in.seek(offset + copied)
+            return copied
+        except (ImportError, OSError):
+            if copied != 0:
+                raise
+            # otherwise, e.g. output is a terminal or platform has no sendfile, so fall back to a regular copy
+
+    # other outputs (e.g. GZIP): copy through a reusable buffer (rather than allocating a new bytes object every read)
+    buf_view = memoryview(buf)
+    while copied < num_bytes:
+        n = f_in.readinto(buf_view[:min(len(buf_view), num_bytes - copied)])
+        if n == 0:
+            break
+        f_out.write(buf_view[:n]); copied += n
+    return copied
+
 # load `num_bytes` bytes starting at `start`
 def load_bytes(in_fns, start, num_bytes, f_out, bufsize=DEFAULT_BUFSIZE):
-    # seek over `start` bytes
-    in_fn_ind = 0
-    while start > 0:
-        if in_fn_ind == len(in_fns):
-            return
-        curr_size = getsize(in_fns[in_fn_ind])
-        if curr_size >= start:
+    # get the cumulative file sizes, but stop once they cover the whole range (so files after it aren't even stat-ed)
+    ends = list(); range_end = start + num_bytes
+    for end in accumulate(getsize(fn) for fn in in_fns):
+        ends.append(end)
+        if end >= range_end:
             break
-        else:
-            start -= curr_size; in_fn_ind += 1
-    if start > getsize(in_fns[in_fn_ind]):
+
+    # seek over `start` bytes (binary search the cumulative file sizes for the first file that ends at or after `start`)
+    in_fn_ind = bisect_left(ends, start)
+    if in_fn_ind == len(ends):
         return
-    f_in = open(in_fns[in_fn_ind], 'rb', buffering=bufsize)
+    if in_fn_ind != 0:
+        start -= ends[in_fn_ind - 1]
+    f_in = open(in_fns[in_fn_ind], 'rb', buffering=0) # unbuffered: seeks/reads go straight to the OS (sendfile or readinto into our own buffer do all of the reading anyway)
     f_in.seek(start); start = 0
 
     # extract bytes
-    while num_bytes > 0:
-        while True:
-            tmp_data = f_in.read(min(bufsize, num_bytes))
-            if len(tmp_data) == 0:
-                break
-            f_out.write(tmp_data); num_bytes -= len(tmp_data)
+    buf = bytearray(bufsize)
+    while True:
+        num_bytes -= copy_bytes(f_in, f_out, num_bytes, buf); f_in.close()
         in_fn_ind += 1
-        if in_fn_ind == len(in_fns):
+        if num_bytes <= 0 or in_fn_ind == len(in_fns):
             return
-        f_in = open(in_fns[in_fn_ind], 'rb', buffering=bufsize)
+        f_in = open(in_fns[in_fn_ind], 'rb', buffering=0)
 
-# main program
-if __name__ == "__main__":
-    args = parse_args()
-    if not isfile(args.input):
-        print("File not found: %s" % args.input); exit(1)
-    if args.output != 'stdout' and isfile(args.output):
-        print("File exists: %s" % args.output); exit(1)
+# parse an integer (e.g. "1000" or "0x9340") given as a string, and exit with an error if it's invalid
+def parse_int(s):
+    if isinstance(s, int):
+        return s
     try:
-        args.start = int(args.start, 0)
+        return int(s, 0)
     except:
-        print("Invalid integer: %s" % args.start); exit(1)
-    try:
-        args.num_bytes = int(args.num_bytes, 0)
-    except:
-        print("Invalid integer: %s" % args.num_bytes); exit(1)
-    if args.input.lower().endswith('.cue'):
-        in_fns = ['%s/%s' % ('/'.join(abspath(expanduser(args.input)).split('/')[:-1]), l.split('"')[1].strip()) for l in open(args.input) if l.strip().lower().startswith('file')]
-    else:
-        in_fns = [args.input]
+        print("Invalid integer: %s" % s); exit(1)
+
+# get the files to read from (the bins of a CUE, otherwise just the file itself)
+def get_input_files(fn):
+    if not fn.lower().endswith('.cue'):
+        return [fn]
+    import re
+    cue_file_regex = re.compile(CUE_FILE_PATTERN, re.IGNORECASE); cue_dir = dirname(abspath(expanduser(fn)))
+    with open(fn) as f_cue:
+        return [join(cue_dir, m.group(1).strip()) for m in map(cue_file_regex.match, f_cue) if m is not None]
+
+# extract `num_bytes` bytes starting at `start` from an input file (or CUE) to an output file (can be called directly, without parsing command line arguments)
+def extract_bytes(in_fn, start, num_bytes, out_fn='stdout', gzip_level=DEFAULT_GZIP_LEVEL):
+    if not isfile(in_fn):
+        print("File not found: %s" % in_fn); exit(1)
+    if out_fn != 'stdout' and isfile(out_fn):
+        print("File exists: %s" % out_fn); exit(1)
+    start = parse_int(start); num_bytes = parse_int(num_bytes)
+    in_fns = get_input_files(in_fn)
     if len(in_fns) == 0:
-        print("Invalid input file: %s" % args.input)
-    f_out = open_output(args.output)
-    b = load_bytes(in_fns, args.start, args.num_bytes, f_out)
-    f_out.close()
+        print("Invalid input file: %s" % in_fn)
+    if not 0 <= gzip_level <= 9:
+        print("Invalid GZIP compression level (must be 0-9): %d" % gzip_level); exit(1)
+    f_out = open_output(out_fn, gzip_level=gzip_level)
+    load_bytes(in_fns, start, num_bytes, f_out)
+    if out_fn == 'stdout':
+        f_out.flush() # don't close standard output (the caller may still want to use it)
+    else:
+        f_out.close()
+
+# main program
+def main(argv=None):
+    args = parse_args(argv)
+    extract_bytes(args.input, args.start, args.num_bytes, out_fn=args.output, gzip_level=args.gzip_level)
+
+# run program
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ Test ConsoleID.py and GameID.py on a series of test files
 '''
 
 # imports
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
+from importlib import import_module
+from os import cpu_count
 from os.path import abspath, expanduser, isdir, isfile
 from subprocess import check_output
 import argparse
@@ -14,8 +17,9 @@ import sys
 SELF_PATH = abspath(expanduser(__file__))
 DEFAULT_CONSOLEID_PATH = SELF_PATH.replace('/scripts/test.py', '/ConsoleID.py')
 DEFAULT_GAMEID_PATH = SELF_PATH.replace('/scripts/test.py', '/GameID.py')
-DEFAULT_GAMEID_DB_PATH = SELF_PATH.replace('/scripts/test.py', '/db.pkl.gz')
+DEFAULT_GAMEID_DB_PATH = SELF_PATH.replace('/scripts/test.py', '/db_sections.pkl.gz')
 DEFAULT_TEST_FILES_PATH = SELF_PATH.replace('/scripts/test.py', '/example')
+DEFAULT_THREADS = cpu_count() or 1
 
 # parse user args
 def parse_args():
@@ -25,6 +29,8 @@ def parse_args():
     parser.add_argument('-g', '--gameid_path', required=False, type=str, default=DEFAULT_GAMEID_PATH, help="Path to GameID.py script")
     parser.add_argument('-d', '--gameid_db_path', required=False, type=str, default=DEFAULT_GAMEID_DB_PATH, help="Path to GameID database")
     parser.add_argument('-t', '--test_files_path', required=False, type=str, default=DEFAULT_TEST_FILES_PATH, help="Path to folder containing test files")
+    parser.add_argument('-j', '--threads', required=False, type=int, default=DEFAULT_THREADS, help="Number of test files to check in parallel (worker processes, or threads with --isolated)")
+    parser.add_argument('--isolated', action="store_true", help="Run ConsoleID and GameID as separate processes for each test file")
     parser.add_argument('-q', '--quiet', action="store_true", help="Suppress messages")
     args = parser.parse_args()
 
@@ -35,67 +41,119 @@ def parse_args():
     args.test_files_path = args.test_files_path.rstrip('/')
     if not isdir(args.test_files_path):
         print("Directory not found: %s" % args.test_files_path); exit(1)
+    if args.threads < 1:
+        print("Number of parallel tests must be positive: %d" % args.threads); exit(1)
     return args
 
-# get bins from CUE
-def bins_from_cue(fn):
-    f_cue = open(fn, 'rt')
-    bins = ['%s/%s' % ('/'.join(abspath(expanduser(fn)).split('/')[:-1]), l.split('"')[1].strip()) for l in f_cue if l.strip().lower().startswith('file')]
-    f_cue.close()
-    return bins
+# import a Python script (e.g. ConsoleID.py) as a module
+def import_script(path):
+    sys.path.insert(0, '/'.join(path.split('/')[:-1]))
+    try:
+        return import_module(path.split('/')[-1][:-3])
+    finally:
+        sys.path.pop(0)
+
+# run ConsoleID and GameID on a single test file in this process (with an already-loaded GameID database), and return the list of failure messages (empty if both passed)
+def run_test_in_process(ConsoleID, GameID, db, console, fn):
+    consoleid_pass = True; gameid_pass = True; failures = list()
+
+    # first check ConsoleID
+    try:
+        consoleid_out = ConsoleID.identify(fn)
+        if consoleid_out is None or consoleid_out.strip().upper() != console.upper():
+            consoleid_pass = False
+    except (Exception, SystemExit): # error() exits, i.e., raises SystemExit
+        consoleid_pass = False
+    if consoleid_pass == False:
+        failures.append("ConsoleID failed: %s" % fn)
+
+    # then check GameID
+    try:
+        if GameID.IDENTIFY[console.upper()](fn, db) is None:
+            gameid_pass = False
+    except (Exception, SystemExit):
+        gameid_pass = False
+    if gameid_pass == False:
+        failures.append("GameID failed: %s" % fn)
+    return failures
+
+# set up a worker process for running tests in parallel (import ConsoleID and GameID and load the GameID database once per worker)
+def init_worker(consoleid_path, gameid_path, gameid_db_path):
+    global WORKER_MODULES
+    GameID = import_script(gameid_path); ConsoleID = import_script(consoleid_path)
+    WORKER_MODULES = (ConsoleID, GameID, GameID.load_db(gameid_db_path))
+
+# run a single (console, file) test case in a worker process
+def run_test_in_worker(test_case):
+    ConsoleID, GameID, db = WORKER_MODULES; console, fn = test_case
+    return run_test_in_process(ConsoleID, GameID, db, console, fn)
+
+# run ConsoleID and GameID on a single test file (as separate processes), and return the list of failure messages (empty if both passed)
+def run_test(consoleid_path, gameid_path, gameid_db_path, console, fn):
+    consoleid_pass = True; gameid_pass = True; failures = list()
+
+    # first check ConsoleID
+    try:
+        consoleid_out = check_output(['python3', consoleid_path, '-i', fn]).decode().strip()
+        if consoleid_out.strip().upper() != console.upper():
+            consoleid_pass = False
+    except:
+        consoleid_pass = False
+    if consoleid_pass == False:
+        failures.append("ConsoleID failed: %s" % fn)
+
+    # then check GameID
+    try:
+        gameid_out = check_output(['python3', gameid_path, '-d', gameid_db_path, '-c', console, '-i', fn]).decode().strip()
+    except:
+        gameid_pass = False
+    if gameid_pass == False:
+        failures.append("GameID failed: %s" % fn)
+    return failures
 
 # run tests
-def run_tests(consoleid_path, gameid_path, gameid_db_path, test_files_path, quiet=False):
-    # import GameID console list
-    sys.path.append('/'.join(gameid_path.split('/')[:-1]))
-    from GameID import GAMEID_CONSOLES
-    sys.path.pop()
-
-    # run tests
-    num_pass = 0; num_fail = 0
-    for console in GAMEID_CONSOLES:
+def run_tests(consoleid_path, gameid_path, gameid_db_path, test_files_path, quiet=False, threads=DEFAULT_THREADS, isolated=False):
+    # import GameID (for its console list and CUE parser)
+    GameID = import_script(gameid_path)
+
+    # gather (console, file) test cases
+    test_cases = list()
+    for console in GameID.GAMEID_CONSOLES:
         test_files = set(glob('%s/%s/*' % (test_files_path, console)))
 
         # remove other files associated with CUE files (which may fail on their own, e.g. multi-track discs)
         cue_files = {fn for fn in test_files if fn.split('.')[-1].lower() == 'cue'}
         for fn in cue_files:
-            for bin_fn in bins_from_cue(fn):
+            for bin_fn in GameID.bins_from_cue(fn):
                 test_files.discard(bin_fn)
+        test_cases += [(console, fn) for fn in sorted(test_files)] # sorted, so failures are reported in the same order every run
+
+    # run tests as separate processes (each one just waits on subprocesses, so run them in parallel threads)
+    if isolated:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda test_case: run_test(consoleid_path, gameid_path, gameid_db_path, test_case[0], test_case[1]), test_cases))
+
+    # run tests in parallel worker processes (each worker imports ConsoleID/GameID and loads the GameID database just once)
+    elif threads > 1 and len(test_cases) > 1:
+        from multiprocessing import Pool
+        with Pool(min(threads, len(test_cases)), initializer=init_worker, initargs=(consoleid_path, gameid_path, gameid_db_path)) as pool:
+            results = list(pool.imap(run_test_in_worker, test_cases, chunksize=4))
+
+    # run tests one-by-one in this process (skips Python startup and loading the GameID database for every single test)
+    else:
+        ConsoleID = import_script(consoleid_path); db = GameID.load_db(gameid_db_path)
+        results = [run_test_in_process(ConsoleID, GameID, db, console, fn) for console, fn in test_cases]
 
-        # run test on current file
-        for fn in test_files:
-            consoleid_pass = True; gameid_pass = True
-
-            # first check ConsoleID
-            try:
-                consoleid_out = check_output(['python3', consoleid_path, '-i', fn]).decode().strip()
-                if consoleid_out.strip().upper() != console.upper():
-                    consoleid_pass = False
-            except:
-                consoleid_pass = False
-            if (consoleid_pass == False) and (not quiet):
-                print("ConsoleID failed: %s" % fn)
-
-            # then check GameID
-            try:
-                gameid_out = check_output(['python3', gameid_path, '-d', gameid_db_path, '-c', console, '-i', fn]).decode().strip()
-            except:
-                gameid_pass = False
-            if (gameid_pass == False) and (not quiet):
-                print("GameID failed: %s" % fn)
-
-            # update global test results
-            if consoleid_pass and gameid_pass:
-                num_pass += 1
-            else:
-                num_fail += 1
+    # print all failure messages at once (rather than as they happen, which can interleave across threads/processes)
+    num_fail = sum(1 for failures in results if len(failures) != 0); num_pass = len(results) - num_fail
+    if not quiet:
+        sys.stdout.write(''.join('%s\n' % failure for failures in results for failure in failures))
     return num_pass, num_fail
 
 # main program
 if __name__ == "__main__":
     args = parse_args()
-    num_pass, num_fail = run_tests(args.consoleid_path, args.gameid_path, args.gameid_db_path, args.test_files_path, quiet=args.quiet)
+    num_pass, num_fail = run_tests(args.consoleid_path, args.gameid_path, args.gameid_db_path, args.test_files_path, quiet=args.quiet, threads=args.threads, isolated=args.isolated)
     if not args.quiet:
-        print("Pass: %d" % num_pass)
-        print("Fail: %d" % num_fail)
+        print("Pass: %d\nFail: %d" % (num_pass, num_fail))
     exit(num_fail)